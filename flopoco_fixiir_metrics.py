@@ -14,14 +14,18 @@ le dimensionnement interne des filtres IIR en virgule fixe.
 
 from __future__ import annotations
 
+import asyncio
 from dataclasses import dataclass
+import functools
+import os
 import re
 import shutil
 import subprocess
+import threading
 from typing import Optional, Sequence
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class FixIIRMetrics:
     H: float
     Heps: Optional[float]
@@ -33,21 +37,161 @@ class FixIIRMetrics:
 _FLOAT_RE = r"([+-]?(?:\d+(?:\.\d*)?|\.\d+)(?:[eE][+-]?\d+)?)"
 
 _RE_H = re.compile(
-    r"(?:Computed filter worst-case peak gain|Filter worst-case peak gain):\s*H=" + _FLOAT_RE
+    r"(?:Computed filter worst-case peak gain|Filter worst-case peak gain):\s*H=" + _FLOAT_RE,
+    re.ASCII,
 )
 _RE_HEPS = re.compile(
     r"(?:Computed error amplification worst-case peak gain|Error amplification worst-case peak gain):\s*Heps="
-    + _FLOAT_RE
+    + _FLOAT_RE,
+    re.ASCII,
 )
-_RE_LSBEXT = re.compile(r"Building an IIR filter faithful to\s*lsbExt=([+-]?\d+)")
+_RE_LSBEXT = re.compile(r"Building an IIR filter faithful to\s*lsbExt=([+-]?\d+)", re.ASCII)
 
+# Once H and lsbExt are parsed, keep reading at most this many extra lines in
+# case Heps shows up slightly later in the log, then give up on it.
+_HEPS_GRACE_LINES = 30
 
+
+class _MetricsParser:
+    """Parseur incrémental des lignes de log FixIIR.
+
+    Partagé entre les chemins synchrone et asynchrone : chaque ligne est
+    passée à :meth:`feed`, qui renvoie True dès que la lecture peut s'arrêter.
+    """
+
+    __slots__ = ("H", "Heps", "lsbExt", "lines", "_heps_enabled", "_heps_grace")
+
+    def __init__(self, heps_enabled: bool = True) -> None:
+        self.H: Optional[float] = None
+        self.Heps: Optional[float] = None
+        self.lsbExt: Optional[int] = None
+        self.lines: list[str] = []
+        # FloPoCo only emits Heps at loglevel >= 1; when it cannot appear,
+        # skip its regex entirely and never wait for it before stopping.
+        self._heps_enabled = heps_enabled
+        self._heps_grace = _HEPS_GRACE_LINES if heps_enabled else 0
+
+    def feed(self, line: str) -> bool:
+        self.lines.append(line)
+        # Cheap substring prefilters: only run a regex on lines that can
+        # possibly contain its metric, so the vast majority of log lines
+        # are rejected without entering the regex engine.
+        if self.H is None and "H=" in line:
+            m = _RE_H.search(line)
+            if m:
+                self.H = float(m.group(1))
+        if self._heps_enabled and self.Heps is None and "Heps=" in line:
+            m = _RE_HEPS.search(line)
+            if m:
+                self.Heps = float(m.group(1))
+        if self.lsbExt is None and "lsbExt=" in line:
+            m = _RE_LSBEXT.search(line)
+            if m:
+                self.lsbExt = int(m.group(1))
+        if self.H is not None and self.lsbExt is not None:
+            if self.Heps is not None or self._heps_grace <= 0:
+                return True
+            self._heps_grace -= 1
+        return False
+
+    @property
+    def complete(self) -> bool:
+        return self.H is not None and self.lsbExt is not None
+
+    def raw_log(self) -> str:
+        return "".join(self.lines)
+
+
+@functools.cache
+def _kv(key: str, value: int) -> str:
+    # Sweeps reuse the same handful of numeric parameters across thousands of
+    # calls; caching the formatted pieces avoids rebuilding the same strings.
+    return f"{key}={value}"
+
+
+def _build_cmd(
+    flopoco_exe: str,
+    coeffb: str,
+    coeffa: str,
+    lsbIn: int,
+    lsbOut: int,
+    loglevel: int,
+    generateFigures: int,
+    extra_args: tuple,
+) -> list:
+    cmd = [
+        flopoco_exe,
+        _kv("generateFigures", int(generateFigures)),
+        "FixIIR",
+        f"coeffb={coeffb}",
+        f"coeffa={coeffa}",
+        _kv("lsbIn", int(lsbIn)),
+        _kv("lsbOut", int(lsbOut)),
+        _kv("loglevel", int(loglevel)),
+    ]
+    if extra_args:
+        cmd.extend(extra_args)
+    return cmd
+
+
+def _finalize(
+    parser: _MetricsParser,
+    *,
+    returncode: Optional[int],
+    short_circuited: bool,
+    timed_out: bool,
+    timeout_s: Optional[float],
+    fallback_H: Optional[float],
+    keep_raw_log: bool = True,
+) -> FixIIRMetrics:
+    raw_log = parser.raw_log()
+    # Error messages always carry the full log; only successful results drop
+    # it when the caller opts out.
+    kept_log = raw_log if keep_raw_log else ""
+
+    if timed_out:
+        # Best effort: if the metrics were already printed before the timeout,
+        # return them anyway.
+        if parser.complete:
+            return FixIIRMetrics(
+                H=parser.H, Heps=parser.Heps, lsbExt=parser.lsbExt, raw_log=kept_log, timedOut=True
+            )
+        raise RuntimeError(
+            f"FloPoCo timeout after {timeout_s}s while running FixIIR. Log:\n{raw_log}"
+        )
+
+    if short_circuited:
+        return FixIIRMetrics(
+            H=parser.H, Heps=parser.Heps, lsbExt=parser.lsbExt, raw_log=kept_log, timedOut=False
+        )
+
+    if returncode != 0:
+        raise RuntimeError(f"FloPoCo exited with code {returncode}. Log:\n{raw_log}")
+
+    H = parser.H
+    if H is None:
+        if fallback_H is not None:
+            H = float(fallback_H)
+        else:
+            raise RuntimeError(f"Could not parse H from FloPoCo log. Log:\n{raw_log}")
+
+    if parser.lsbExt is None:
+        raise RuntimeError(f"Could not parse lsbExt from FloPoCo log. Log:\n{raw_log}")
+
+    return FixIIRMetrics(
+        H=H, Heps=parser.Heps, lsbExt=parser.lsbExt, raw_log=kept_log, timedOut=False
+    )
+
+
+@functools.cache
 def _resolve_flopoco_exe(flopoco_exe: Optional[str]) -> str:
+    # Cached so batched sweeps pay the PATH scan (and its stat syscalls)
+    # only once per distinct flopoco_exe argument.
     if flopoco_exe:
         return flopoco_exe
     found = shutil.which("flopoco")
-    if found:
-        return found
+    if found and os.access(found, os.X_OK):
+        return os.path.abspath(found)
     # Common local build location
     return "./build/flopoco"
 
@@ -64,6 +208,7 @@ def run_fixiir_and_parse_metrics(
     extra_args: Optional[Sequence[str]] = None,
     timeout_s: Optional[float] = None,
     fallback_H: Optional[float] = None,
+    keep_raw_log: bool = True,
 ) -> FixIIRMetrics:
     """
     Lance FloPoCo FixIIR et extrait les métriques (H, Heps, lsbExt).
@@ -81,100 +226,295 @@ def run_fixiir_and_parse_metrics(
         flopoco_exe : chemin vers l’exécutable FloPoCo, ou None pour une détection automatique.
         extra_args : arguments supplémentaires passés à FloPoCo (par ex. target=...).
         timeout_s : délai maximal d’exécution du sous-processus.
+        keep_raw_log : mettre à False pour ne pas conserver le log brut dans le
+                résultat (utile pour les grands balayages, où raw_log domine la
+                mémoire) ; les messages d’erreur contiennent toujours le log complet.
+
+    La sortie du sous-processus est lue en streaming : dès que H et lsbExt ont
+    été extraits du log, FloPoCo est interrompu sans attendre la fin de la
+    synthèse de l’opérateur (qui peut prendre plusieurs minutes).
+
+    Les résultats sont mémoïsés : rappeler la fonction avec les mêmes
+    arguments renvoie les métriques déjà calculées sans relancer FloPoCo.
+    Seuls les résultats complets sont mis en cache : une extraction partielle
+    obtenue sur timeout (timedOut=True) relancera FloPoCo au prochain appel.
+    """
 
+    try:
+        return _run_fixiir_cached(
+            coeffb,
+            coeffa,
+            int(lsbIn),
+            int(lsbOut),
+            int(loglevel),
+            int(generateFigures),
+            flopoco_exe,
+            tuple(extra_args) if extra_args else (),
+            timeout_s,
+            fallback_H,
+            keep_raw_log,
+        )
+    except _TimedOutMetrics as e:
+        return e.metrics
+
+
+class _TimedOutMetrics(Exception):
+    """Transporte un résultat best-effort (timedOut=True) hors du cache.
+
+    lru_cache ne mémoïse pas les exceptions : lever celle-ci garantit qu'un
+    résultat partiel obtenu sur timeout n'est jamais resservi à un appel
+    ultérieur, qui relancera FloPoCo.
     """
 
-    flopoco_exe = _resolve_flopoco_exe(flopoco_exe)
+    def __init__(self, metrics: FixIIRMetrics) -> None:
+        super().__init__("timed-out FixIIR metrics (not cached)")
+        self.metrics = metrics
 
-    cmd = [
-        flopoco_exe,
-        f"generateFigures={int(generateFigures)}",
-        "FixIIR",
-        f"coeffb={coeffb}",
-        f"coeffa={coeffa}",
-        f"lsbIn={int(lsbIn)}",
-        f"lsbOut={int(lsbOut)}",
-        f"loglevel={int(loglevel)}",
-    ]
-    if extra_args:
-        cmd.extend(list(extra_args))
 
+@functools.lru_cache(maxsize=4096)
+def _run_fixiir_cached(
+    coeffb: str,
+    coeffa: str,
+    lsbIn: int,
+    lsbOut: int,
+    loglevel: int,
+    generateFigures: int,
+    flopoco_exe: Optional[str],
+    extra_args: tuple,
+    timeout_s: Optional[float],
+    fallback_H: Optional[float],
+    keep_raw_log: bool,
+) -> FixIIRMetrics:
+    flopoco_exe = _resolve_flopoco_exe(flopoco_exe)
+    cmd = _build_cmd(flopoco_exe, coeffb, coeffa, lsbIn, lsbOut, loglevel, generateFigures, extra_args)
+
+    # FixIIR prints H/Heps/lsbExt early, then spends a long time synthesizing
+    # the operator. Stream the log line by line and kill the process as soon
+    # as the metrics are parsed instead of paying for the whole synthesis.
     try:
-        # Use bytes output and decode explicitly to avoid mixing bytes/str
-        proc = subprocess.run(
+        # close_fds=False (with no shell and no preexec_fn) lets CPython take
+        # the posix_spawn fast path instead of fork+exec — before 3.13,
+        # close_fds=True disqualifies it. This matters when sweeps spawn
+        # FloPoCo thousands of times. Tradeoff: the child can inherit fds
+        # beyond stdio, but Python opens its own fds non-inheritable
+        # (PEP 446), so only descriptors explicitly made inheritable leak.
+        proc = subprocess.Popen(
             cmd,
-            capture_output=True,
-            text=False,
-            check=False,
-            timeout=timeout_s,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            bufsize=65536,
+            text=True,
+            encoding="utf-8",
+            errors="replace",
+            close_fds=False,
         )
-    except subprocess.TimeoutExpired as e:
-        # e.stdout / e.stderr may be bytes or None
-        stdout_b = e.stdout or b""
-        stderr_b = e.stderr or b""
-        try:
-            stdout = stdout_b.decode("utf-8", errors="replace") if isinstance(stdout_b, (bytes, bytearray)) else str(stdout_b)
-            stderr = stderr_b.decode("utf-8", errors="replace") if isinstance(stderr_b, (bytes, bytearray)) else str(stderr_b)
-        except Exception:
-            stdout = str(stdout_b)
-            stderr = str(stderr_b)
-        raw_log = stdout + "\n" + stderr
-        # Best effort: FixIIR often prints H/Heps/lsbExt early, then spends a long time
-        # synthesizing the operator. If we already have the metrics, return them.
-        mH = _RE_H.search(raw_log)
-        mHeps = _RE_HEPS.search(raw_log)
-        mlsb = _RE_LSBEXT.search(raw_log)
-        if mH and mlsb:
-            H = float(mH.group(1))
-            Heps = float(mHeps.group(1)) if mHeps else None
-            lsbExt = int(mlsb.group(1))
-            return FixIIRMetrics(H=H, Heps=Heps, lsbExt=lsbExt, raw_log=raw_log, timedOut=True)
-
+    except FileNotFoundError as e:
         raise RuntimeError(
-            f"FloPoCo timeout after {timeout_s}s while running FixIIR. Log:\n{raw_log}"
+            f"FloPoCo executable not found: {flopoco_exe}. "
+            f"Either install `flopoco` in PATH or pass flopoco_exe=..."
         ) from e
+
+    timed_out = False
+
+    def _on_timeout() -> None:
+        nonlocal timed_out
+        timed_out = True
+        try:
+            proc.kill()
+        except ProcessLookupError:
+            pass
+
+    # The context manager closes the stdout pipe on every exit path (the
+    # baseline subprocess.run did the same internally).
+    with proc:
+        watchdog = threading.Timer(timeout_s, _on_timeout) if timeout_s is not None else None
+        if watchdog is not None:
+            watchdog.start()
+
+        parser = _MetricsParser(heps_enabled=loglevel >= 1)
+        short_circuited = False
+        try:
+            for line in proc.stdout:
+                if parser.feed(line):
+                    short_circuited = True
+                    break
+        finally:
+            if watchdog is not None:
+                watchdog.cancel()
+
+        if short_circuited:
+            proc.terminate()
+            try:
+                proc.wait(timeout=1)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+                proc.wait()
+        else:
+            proc.wait()
+
+    metrics = _finalize(
+        parser,
+        returncode=proc.returncode,
+        short_circuited=short_circuited,
+        timed_out=timed_out,
+        timeout_s=timeout_s,
+        fallback_H=fallback_H,
+        keep_raw_log=keep_raw_log,
+    )
+    if metrics.timedOut:
+        raise _TimedOutMetrics(metrics)
+    return metrics
+
+
+async def run_fixiir_and_parse_metrics_async(
+    *,
+    coeffb: str,
+    coeffa: str,
+    lsbIn: int,
+    lsbOut: int,
+    loglevel: int = 1,
+    generateFigures: int = 0,
+    flopoco_exe: Optional[str] = None,
+    extra_args: Optional[Sequence[str]] = None,
+    timeout_s: Optional[float] = None,
+    fallback_H: Optional[float] = None,
+    keep_raw_log: bool = True,
+) -> FixIIRMetrics:
+    """
+    Variante asynchrone de `run_fixiir_and_parse_metrics`.
+
+    Mêmes arguments et même sémantique (lecture en streaming, arrêt dès que
+    H et lsbExt sont extraits), mais le sous-processus est piloté par
+    asyncio, ce qui permet de lancer plusieurs FloPoCo en parallèle — voir
+    `run_many`. Contrairement à la version synchrone, les résultats ne sont
+    pas mémoïsés.
+    """
+
+    flopoco_exe = _resolve_flopoco_exe(flopoco_exe)
+    cmd = _build_cmd(
+        flopoco_exe,
+        coeffb,
+        coeffa,
+        lsbIn,
+        lsbOut,
+        loglevel,
+        generateFigures,
+        tuple(extra_args) if extra_args else (),
+    )
+
+    try:
+        proc = await asyncio.create_subprocess_exec(
+            *cmd,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.STDOUT,
+        )
     except FileNotFoundError as e:
         raise RuntimeError(
             f"FloPoCo executable not found: {flopoco_exe}. "
             f"Either install `flopoco` in PATH or pass flopoco_exe=..."
         ) from e
 
-    # proc.stdout / proc.stderr are bytes (text=False). Decode safely.
-    stdout_b = proc.stdout or b""
-    stderr_b = proc.stderr or b""
+    parser = _MetricsParser(heps_enabled=loglevel >= 1)
+    short_circuited = False
+    timed_out = False
+
+    async def _read_stream() -> None:
+        nonlocal short_circuited
+        async for raw in proc.stdout:
+            if parser.feed(raw.decode("utf-8", errors="replace")):
+                short_circuited = True
+                return
+
     try:
-        stdout = stdout_b.decode("utf-8", errors="replace") if isinstance(stdout_b, (bytes, bytearray)) else str(stdout_b)
-        stderr = stderr_b.decode("utf-8", errors="replace") if isinstance(stderr_b, (bytes, bytearray)) else str(stderr_b)
-    except Exception:
-        stdout = str(stdout_b)
-        stderr = str(stderr_b)
-    raw_log = stdout + "\n" + stderr
-
-    if proc.returncode != 0:
-        raise RuntimeError(f"FloPoCo exited with code {proc.returncode}. Log:\n{raw_log}")
-
-    mH = _RE_H.search(raw_log)
-    if mH:
-        H = float(mH.group(1))
-    elif fallback_H is not None:
-        H = float(fallback_H)
-    else:
-        raise RuntimeError(f"Could not parse H from FloPoCo log. Log:\n{raw_log}")
-
-    mHeps = _RE_HEPS.search(raw_log)
-    Heps = float(mHeps.group(1)) if mHeps else None
-
-    mlsb = _RE_LSBEXT.search(raw_log)
-    if not mlsb:
-        raise RuntimeError(f"Could not parse lsbExt from FloPoCo log. Log:\n{raw_log}")
-    lsbExt = int(mlsb.group(1))
+        try:
+            if timeout_s is not None:
+                await asyncio.wait_for(_read_stream(), timeout=timeout_s)
+            else:
+                await _read_stream()
+        except asyncio.TimeoutError:
+            timed_out = True
+            try:
+                proc.kill()
+            except ProcessLookupError:
+                pass
+
+        if short_circuited:
+            try:
+                proc.terminate()
+            except ProcessLookupError:
+                pass
+            # Same escalation as the sync path: a child ignoring SIGTERM must
+            # not hang the coroutine forever.
+            try:
+                await asyncio.wait_for(proc.wait(), timeout=1)
+            except asyncio.TimeoutError:
+                try:
+                    proc.kill()
+                except ProcessLookupError:
+                    pass
+        await proc.wait()
+    finally:
+        # If the coroutine is cancelled (e.g. a sibling in run_many failed)
+        # or exits abnormally, don't leak a FloPoCo still synthesizing.
+        if proc.returncode is None:
+            try:
+                proc.kill()
+            except ProcessLookupError:
+                pass
+            await proc.wait()
+
+    return _finalize(
+        parser,
+        returncode=proc.returncode,
+        short_circuited=short_circuited,
+        timed_out=timed_out,
+        timeout_s=timeout_s,
+        fallback_H=fallback_H,
+        keep_raw_log=keep_raw_log,
+    )
+
+
+def run_many(configs: Sequence[dict], concurrency: int = 4) -> list:
+    """
+    Lance plusieurs configurations FixIIR en parallèle et renvoie la liste
+    des `FixIIRMetrics` dans le même ordre que `configs`.
+
+    Arguments :
+        configs : séquence de dicts d'arguments pour
+                `run_fixiir_and_parse_metrics_async` (coeffb=..., coeffa=..., etc.).
+        concurrency : nombre maximal de processus FloPoCo simultanés.
+                FloPoCo est monothread : le nombre de cœurs physiques est un bon choix.
+
+    À utiliser depuis du code synchrone ; depuis une boucle asyncio déjà
+    active (par ex. un notebook Jupyter), appeler directement
+    `run_fixiir_and_parse_metrics_async` avec `asyncio.gather`.
+    """
+
+    async def _gather() -> list:
+        sem = asyncio.Semaphore(concurrency)
+
+        async def _one(cfg: dict) -> FixIIRMetrics:
+            async with sem:
+                return await run_fixiir_and_parse_metrics_async(**cfg)
+
+        tasks = [asyncio.create_task(_one(cfg)) for cfg in configs]
+        try:
+            return list(await asyncio.gather(*tasks))
+        except BaseException:
+            # One config failed: cancel the siblings and wait for their
+            # cleanup (which kills the FloPoCo children) inside the running
+            # loop, instead of leaking them at loop shutdown.
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
 
-    return FixIIRMetrics(H=H, Heps=Heps, lsbExt=lsbExt, raw_log=raw_log, timedOut=False)
+    return asyncio.run(_gather())
 
 
 def coeffs_to_flopoco_hex_list(coeffs) -> str:
     """Convert an iterable of floats to a ':' separated list of hex-float literals."""
-    return ":".join([float(c).hex() for c in coeffs])
+    return ":".join(c.hex() if type(c) is float else float(c).hex() for c in coeffs)
 
 
 if __name__ == "__main__":
@@ -1,49 +1,58 @@
-
-
-import csv
-
-def compteur(n):
-    return [(n >> i) & 1 for i in reversed(range(8))]
-
-def bit3(n) : 
-    return [(n >> i) & 1 for i in reversed(range(3))]
-
-
-
-
-def sortie(n) : 
-    k = 7
-    while k >= 0 : 
-        if compteur(n)[k] == 0 : 
-            return [int(i == k) for i in range(8)] + bit3(7-k) 
-        k -= 1
-    return [0]*8 + [0]*3
-    
-    
-
-
-def exporter_csv(nom="table_verite.csv"):
-    with open(nom, "w", newline="") as f:
-        writer = csv.writer(f)
-
-        # En-tête avec séparations
-        writer.writerow(
-            [f"E{i}" for i in range(8)] +
-            ["|"] +
-            [f"WE{i}" for i in range(8)] +
-            ["||"] +
-            ["Sel2", "Sel1", "Sel0"]
-        )
-
-        for n in range(256):
-            writer.writerow(
-                compteur(n) +
-                ["|"] +
-                sortie(n)[:8] +
-                ["||"] +
-                sortie(n)[8:]
-            )
-
-
-exporter_csv()
-
+
+
+import csv
+
+def compteur(n):
+    return [(n >> i) & 1 for i in reversed(range(8))]
+
+def bit3(n) :
+    return [(n >> i) & 1 for i in reversed(range(3))]
+
+
+
+
+def sortie(n) :
+    m = ~n & 0xFF  # bits à 0 de n
+    if m == 0 :
+        return [0]*8 + [0]*3
+    p = (m & -m).bit_length() - 1  # position du bit à 0 de poids faible
+    k = 7 - p
+    return [int(i == k) for i in range(8)] + bit3(p)
+
+
+
+
+def _construire_lignes():
+    """Construit une fois pour toutes les 256 lignes de la table.
+
+    Tout est en arithmétique entière (compteur/sortie sont déjà sans
+    boucle interne), si bien que l'export se réduit à de l'E/S pure.
+    """
+    lignes = []
+    for n in range(256):
+        s = sortie(n)
+        lignes.append(compteur(n) + ["|"] + s[:8] + ["||"] + s[8:])
+    return lignes
+
+
+_LIGNES = _construire_lignes()
+
+
+def exporter_csv(nom="table_verite.csv"):
+    with open(nom, "w", newline="", buffering=1 << 16) as f:
+        writer = csv.writer(f)
+
+        # En-tête avec séparations
+        writer.writerow(
+            [f"E{i}" for i in range(8)] +
+            ["|"] +
+            [f"WE{i}" for i in range(8)] +
+            ["||"] +
+            ["Sel2", "Sel1", "Sel0"]
+        )
+
+        writer.writerows(_LIGNES)
+
+
+exporter_csv()
+